@@ -2,218 +2,489 @@ import os
 import yaml
 import sys
 import argparse
+import codecs
+import json
+import mmap
+import re
+import shutil
+import stat
+import tempfile
+from bisect import bisect_left
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+
+# Prefer the libyaml-backed loader; PyYAML only provides it when built against libyaml.
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+
+# Below this many files the process pool startup costs more than it saves.
+MIN_FILES_FOR_POOL = 8
+
+# Per-project cache of extracted columns, keyed by file path and (mtime, size).
+CACHE_FILE = '.check_dbt_descriptions.cache.json'
+CACHE_VERSION = 7
 
 def find_yaml_files(root_dir):
-    yaml_files = []
-    for root, dirs, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith('.yml') or file.endswith('.yaml'):
-                yaml_files.append(os.path.join(root, file))
-    return yaml_files
+    """
+    Lazily yields an os.DirEntry for every .yml/.yaml file under root_dir.
+    Entries cache their stat() result, so callers can stat without a second syscall.
+    """
+    try:
+        it = os.scandir(root_dir)
+    except OSError as e:
+        # Unreadable directories are skipped, as os.walk did
+        print(f"Warning: Skipping {root_dir}: {e}")
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from find_yaml_files(entry.path)
+            # Symlinked files are scanned like os.walk did; only directory links are not followed
+            elif entry.is_file() and entry.name.endswith(('.yml', '.yaml')):
+                yield entry
 
-def get_indent(line):
-    return len(line) - len(line.lstrip())
+# Top-level keys that make a YAML file worth parsing
+SCHEMA_KEYS_RE = re.compile(rb'^(?:\xef\xbb\xbf)?["\']?(?:models|sources)["\']?[ \t]*:', re.M)
+# A 'columns' key at any depth, in block or flow style
+COLUMNS_KEY_RE = re.compile(rb'\bcolumns["\']?[ \t]*:')
+# The '*name' token of an alias value right after its key: ': *shared_desc'
+ALIAS_RE = re.compile(r'\s*:\s*(\*[^\s,\[\]{}]+)')
+# Anchor and tag properties in front of a value: '&name', '!!str'
+PROPERTIES_RE = re.compile(r'(?:[&!][^\s,\[\]{}]*[ \t]*)*')
 
-def find_child_block(lines, parent_idx, key=None, name=None):
+def load_schema(source):
     """
-    Finds a child block inside parent_idx.
-    If key is provided, looks for 'key:'.
-    If name is provided, looks for '- name: name'.
-    Returns the line index or -1.
+    Parses a YAML document and returns (data, root): the loaded data and the
+    node tree it was built from, whose marks locate every value in source.
     """
-    if parent_idx >= len(lines):
-        return -1
-        
-    parent_indent = get_indent(lines[parent_idx])
-    
-    for i in range(parent_idx + 1, len(lines)):
-        line = lines[i]
-        stripped = line.strip()
-        
-        # Skip empty lines and comments
-        if not stripped or stripped.startswith('#'):
-            continue
-            
-        curr_indent = get_indent(line)
-        
-        # If we went back to parent level or higher, we failed to find it in the block
-        if curr_indent <= parent_indent:
-            return -1
-            
-        if key and stripped.startswith(f"{key}:"):
-            return i
-            
-        if name and stripped.startswith("- name:"):
-            val = stripped.split(':', 1)[1].strip()
-            # Remove quotes
-            if (val.startswith('"') and val.endswith('"')) or (val.startswith("'") and val.endswith("'")):
-                val = val[1:-1]
-            if val == name:
-                return i
-                
-    return -1
+    loader = _Loader(source)
+    try:
+        root = loader.get_single_node()
+        data = loader.construct_document(root) if root is not None else None
+    finally:
+        loader.dispose()
+    return data, root
+
+def written_within(node, outer):
+    """
+    Tells whether node is written inside outer. Merge keys and aliases reuse
+    the node written at the anchor, so their marks point there instead.
+    """
+    return outer.start_mark.index <= node.start_mark.index < outer.end_mark.index
+
+def child_nodes(node, key, count):
+    """
+    Returns the item nodes of the sequence under key in a mapping node, or
+    count Nones when the value is not written in this node (a merge key or an
+    alias). Items that are aliases are None as well.
+    """
+    for key_node, value_node in reversed(node.value):
+        if key_node.value == key and isinstance(value_node, yaml.SequenceNode):
+            if not written_within(value_node, node):
+                break
+            return [item if written_within(item, value_node) else None for item in value_node.value]
+    return [None] * count
+
+def iter_columns(data, root):
+    """
+    Yields (col, col_node, type, parent, table) for every column of a loaded
+    schema file. col_node is the column's mapping node in root, or None when
+    it cannot be told apart in the tree.
+    """
+    if 'models' in data:
+        models = data['models']
+        for model, model_node in zip(models, child_nodes(root, 'models', len(models))):
+            m_name = model.get('name')
+            cols = model.get('columns', [])
+            col_nodes = child_nodes(model_node, 'columns', len(cols)) if model_node else [None] * len(cols)
+            for col, col_node in zip(cols, col_nodes):
+                yield col, col_node, 'model', m_name, None
+
+    if 'sources' in data:
+        sources = data['sources']
+        for source, source_node in zip(sources, child_nodes(root, 'sources', len(sources))):
+            s_name = source.get('name')
+            tables = source.get('tables', [])
+            table_nodes = child_nodes(source_node, 'tables', len(tables)) if source_node else [None] * len(tables)
+            for table, table_node in zip(tables, table_nodes):
+                t_name = table.get('name')
+                cols = table.get('columns', [])
+                col_nodes = child_nodes(table_node, 'columns', len(cols)) if table_node else [None] * len(cols)
+                for col, col_node in zip(cols, col_nodes):
+                    yield col, col_node, 'source', s_name, t_name
+
+def column_edit(col_node):
+    """
+    Returns where a fix to this column's description goes, from the parser's marks:
+    ('replace', start, end) over the current description value,
+    ('alias', pos, None) when the description is an alias, whose token follows
+    the key ending at pos, or
+    ('insert', pos, indent) right after the name value (indent is None in a
+    flow mapping). A description inherited from a merge key gets an insert, so
+    the override lands in the column and the anchor stays untouched.
+    Positions are character offsets; None if unknown.
+    """
+    if not isinstance(col_node, yaml.MappingNode):
+        return None
+    # Keys pulled in through '<<: *anchor' are flattened into the node too, but
+    # their marks point into the anchor; only keys written in the column count
+    pairs = {key_node.value: (key_node, value_node) for key_node, value_node in col_node.value
+             if written_within(key_node, col_node)}
+    if 'description' in pairs:
+        key_node, value_node = pairs['description']
+        if not written_within(value_node, col_node):
+            # An alias: rewriting the anchored value would change every other use
+            return ('alias', key_node.end_mark.index, None)
+        return ('replace', value_node.start_mark.index, value_node.end_mark.index)
+    if 'name' in pairs:
+        key_node, value_node = pairs['name']
+        if col_node.flow_style:
+            if not written_within(value_node, col_node):
+                return None
+            return ('insert', value_node.end_mark.index, None)
+        # The new line goes after the name's line, wherever an aliased value is
+        pos = value_node.end_mark.index if written_within(value_node, col_node) else key_node.end_mark.index
+        return ('insert', pos, key_node.start_mark.column)
+    return None
+
+@lru_cache(maxsize=None)
+def quote_scalar(val):
+    """
+    Renders val as a single-line double-quoted YAML scalar, escaping
+    quotes, backslashes and newlines. Cached: one winning description is
+    usually written to many columns, so each is emitted only once.
+    """
+    return yaml.dump(val, Dumper=_Dumper, default_style='"', width=2**31 - 1, allow_unicode=True).rstrip('\n')
 
 def update_file(file_path, fixes):
     """
-    fixes: list of dicts with keys: type, parent, table, col, new_desc
+    fixes: list of dicts with keys: type, parent, table, col, new_desc, edit
+    (edit is the location recorded by column_edit during the scan)
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        
-    # Sort fixes by reverse order of appearance? No, we need to find them first.
-    # Since we are modifying lines, indices might shift if we insert lines.
-    # But we are mostly replacing. If we insert, we need to handle shifts.
-    # Simplest is to apply one by one and re-search, or track shifts.
-    # Or just read fresh for each fix? That's slow but safe.
-    # Given small file count, let's read fresh or be careful.
-    # Actually, if we just replace lines, indices don't shift.
-    # If we insert 'description:', they shift.
-    
-    # Let's try to do it in one pass or re-read. Re-reading is safer for MVP.
-    
-    # Group fixes by file is already done by caller.
-    # We will apply fixes sequentially.
-    
-    modified = False
-    
+    text = Path(file_path).read_bytes().decode('utf-8')
+
+    # Marks were taken with any BOM stripped
+    offset = 1 if text.startswith('\ufeff') else 0
+    # Write new lines with the file's own line ending
+    first_break = text.find('\n')
+    newline = '\r\n' if first_break > 0 and text[first_break - 1] == '\r' else '\n'
+
+    # Every fix already knows its position, so all edits are spliced in one pass.
+    # edits: (start, end) character range -> replacement text (start == end inserts)
+    edits = {}
+
     for fix in fixes:
-        # We need to re-scan because line numbers might have changed if we inserted
-        # But to avoid infinite loop or complexity, let's just scan.
-        
-        # 1. Find root key (models or sources)
-        root_key = 'models' if fix['type'] == 'model' else 'sources'
-        
-        # Scan for "models:" or "sources:" at top level (indent 0 usually, or just find it)
-        root_idx = -1
-        for i, line in enumerate(lines):
-            if line.strip().startswith(f"{root_key}:"):
-                root_idx = i
-                break
-        
-        if root_idx == -1:
-            print(f"  Warning: Could not find '{root_key}:' in {file_path}")
-            continue
-            
-        # 2. Find parent (model/source name)
-        parent_idx = find_child_block(lines, root_idx, name=fix['parent'])
-        if parent_idx == -1:
-            print(f"  Warning: Could not find {fix['type']} '{fix['parent']}' in {file_path}")
+        if fix['edit'] is None:
+            print(f"  Warning: Could not locate column '{fix['col']}' of {fix['type']} '{fix['parent']}' in {file_path}")
             continue
-            
-        current_idx = parent_idx
-        
-        # 3. If source, find table
-        if fix['type'] == 'source':
-            tables_idx = find_child_block(lines, current_idx, key='tables')
-            if tables_idx == -1:
-                print(f"  Warning: Could not find 'tables:' in {file_path}")
-                continue
-            
-            table_idx = find_child_block(lines, tables_idx, name=fix['table'])
-            if table_idx == -1:
-                print(f"  Warning: Could not find table '{fix['table']}' in {file_path}")
+
+        new_desc_str = quote_scalar(fix['new_desc'])
+        kind, start, arg = fix['edit']
+        start += offset
+
+        if kind == 'replace':
+            # Replace the old value; keep the line break and blank lines a block scalar swallows
+            end = arg + offset
+            while end > start and text[end - 1] in ' \t\r\n':
+                end -= 1
+            # Keep an anchor or tag in front of the value; aliases of it follow the new text
+            start = PROPERTIES_RE.match(text, start, end).end()
+            # 'description:' with no value needs the space after the colon
+            edits[(start, end)] = new_desc_str if end > start else f" {new_desc_str}"
+        elif kind == 'alias':
+            # Replace only the '*name' token, leaving the anchored value as it is
+            match = ALIAS_RE.match(text, start)
+            if match is None:
+                print(f"  Warning: Could not locate column '{fix['col']}' of {fix['type']} '{fix['parent']}' in {file_path}")
                 continue
-            current_idx = table_idx
-            
-        # 4. Find columns
-        cols_idx = find_child_block(lines, current_idx, key='columns')
-        if cols_idx == -1:
-            print(f"  Warning: Could not find 'columns:' in {file_path}")
-            continue
-            
-        # 5. Find column
-        col_idx = find_child_block(lines, cols_idx, name=fix['col'])
-        if col_idx == -1:
-            print(f"  Warning: Could not find column '{fix['col']}' in {file_path}")
-            continue
-            
-        # 6. Find description
-        desc_idx = find_child_block(lines, col_idx, key='description')
-        
-        escaped_desc = fix['new_desc'].replace('"', '\\"')
-        new_desc_str = f'"{escaped_desc}"'
-        
-        if desc_idx != -1:
-            # Replace existing
-            line = lines[desc_idx]
-            key_part = line.split(':', 1)[0]
-            # Preserve comment if any?
-            # If line has #, keep it? Too complex. Just replace value.
-            lines[desc_idx] = f"{key_part}: {new_desc_str}\n"
-            modified = True
+            edits[match.span(1)] = new_desc_str
+        elif arg is None:
+            # Flow mapping: {name: x, ...}
+            edits[(start, start)] = f", description: {new_desc_str}"
         else:
-            # Insert new
-            col_line = lines[col_idx]
-            indent = get_indent(col_line)
-            # Assume standard indent increase (2 spaces)
-            prefix = " " * (indent + 2)
-            lines.insert(col_idx + 1, f"{prefix}description: {new_desc_str}\n")
-            modified = True
-            
-    if modified:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
+            # Insert new on the line after the column's name, at the name's indent
+            line = f"{' ' * arg}description: {new_desc_str}{newline}"
+            pos = text.find('\n', start) + 1
+            if pos == 0:
+                pos = len(text)
+                line = newline + line
+            edits[(pos, pos)] = line
+
+    if edits:
+        segments = []
+        pos = 0
+        for start, end in sorted(edits):
+            segments.append(text[pos:start])
+            segments.append(edits[(start, end)])
+            pos = end
+        segments.append(text[pos:])
+
+        # Write the whole file at once to a temp file and swap it in atomically.
+        # Resolve symlinks first so the link's target is updated, not replaced.
+        real_path = os.path.realpath(file_path)
+        tmp_path = real_path + '.tmp'
+        try:
+            Path(tmp_path).write_bytes(''.join(segments).encode('utf-8'))
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(real_path).st_mode))
+            os.replace(tmp_path, real_path)
+        finally:
+            # Still there only if a step above failed
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
         print(f"Updated {file_path}")
 
-def check_and_fix(dbt_root, fix_mode=False):
-    models_dir = os.path.join(dbt_root, 'models')
-    if not os.path.exists(models_dir):
+def _extract_from_file(file_path, size):
+    """
+    Parses one YAML file of the given size (as already stat'ed by the caller)
+    and returns a list of (col_name, description, file, type, parent, table, edit)
+    records, or None if the file could not be read.
+    Runs inside worker processes, so it must stay a top-level function.
+    """
+    extracted = []
+    try:
+        with open(file_path, 'rb') as f:
+            if size == 0:
+                return extracted
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Cheap pre-filter: dbt_project.yml, packages.yml etc. never get parsed,
+                # and neither do schema files that list no columns at all
+                if not (SCHEMA_KEYS_RE.search(mm) and COLUMNS_KEY_RE.search(mm)):
+                    return extracted
+                raw = mm[:]
+
+        # Marks locate each description for fixes. They are taken with any BOM
+        # stripped, because the C and Python parsers count it differently.
+        data, root = load_schema(raw[len(codecs.BOM_UTF8):] if raw.startswith(codecs.BOM_UTF8) else raw)
+        if not data: return extracted
+
+        for col, col_node, kind, parent, table in iter_columns(data, root):
+            c_name = col.get('name')
+            # Treat None as empty string
+            desc = col.get('description') or ''
+            if c_name:
+                extracted.append((c_name, desc, file_path, kind, parent, table, column_edit(col_node)))
+
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return None
+
+    return extracted
+
+def _split_cache_line(line):
+    """
+    Splits a cache line into (file_path, stamp, records). Each line is one YAML
+    file: a short JSON head with the path and stamp, a tab, then the JSON list
+    of records, which is left undecoded. JSON escapes tabs inside strings, so
+    the first tab always ends the head.
+    """
+    head, _, records = line.partition(b'\t')
+    file_path, mtime_ns, size = json.loads(head)
+    return file_path, (mtime_ns, size), records
+
+def _records_from_json(file_path, records):
+    # The file path is stored once per entry, in its head
+    return [(c_name, desc, file_path, kind, parent, table, tuple(edit) if edit else None)
+            for c_name, desc, kind, parent, table, edit in json.loads(records)]
+
+def _load_cache_index(cache_path):
+    """
+    Returns {file_path: ((mtime_ns, size), offset)} for the entries of the
+    previous run's cache, or an empty dict if there is no usable cache.
+    Only the heads are decoded; records are read back per file when reused.
+    The cache lives in the scanned project, so it is plain JSON: loading it
+    never runs code, and a malformed file is just ignored.
+    """
+    index = {}
+    try:
+        with open(cache_path, 'rb') as f:
+            header = json.loads(f.readline())
+            if not isinstance(header, dict) or header.get('version') != CACHE_VERSION:
+                return {}
+            offset = f.tell()
+            for line in f:
+                file_path, stamp, _ = _split_cache_line(line)
+                index[file_path] = (stamp, offset)
+                offset += len(line)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable cache {cache_path}: {e}")
+        return {}
+    return index
+
+def _read_cache_line(f, offset):
+    f.seek(offset)
+    return f.readline()
+
+def _write_cache_entry(f, file_path, stamp, extracted):
+    head = json.dumps([file_path, *stamp])
+    records = [(c_name, desc, kind, parent, table, edit) for c_name, desc, _, kind, parent, table, edit in extracted]
+    # default=str covers odd YAML names such as dates; they are only displayed
+    f.write(f"{head}\t{json.dumps(records, default=str)}\n".encode('utf-8'))
+
+def _save_cache(cache_path, spool):
+    """
+    Writes the entries collected in spool as the new cache, atomically.
+    """
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps({'version': CACHE_VERSION}).encode('utf-8') + b'\n')
+            spool.seek(0)
+            shutil.copyfileobj(spool, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write cache {cache_path}: {e}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _merge_results(col_descs, extracted):
+    """
+    Notes the descriptions of each extracted column in col_descs and returns
+    the records with column names and descriptions as strings, as they read
+    back from the cache.
+    """
+    merged = []
+    for c_name, desc, *location in extracted:
+        c_name = str(c_name)
+        desc = str(desc)
+        # Two distinct descriptions are enough to know the column needs a look
+        descs = col_descs.setdefault(c_name, set())
+        if len(descs) < 2:
+            descs.add(desc)
+        merged.append((c_name, desc, *location))
+    return merged
+
+def select_columns(records, patterns):
+    """
+    Returns the records whose column name matches any of the glob patterns.
+    records must be sorted by column name: the literal prefix of each pattern
+    is found by binary search, so only records sharing that prefix are matched.
+    """
+    ranges = []
+    for pattern in patterns:
+        prefix = re.split(r'[*?[]', pattern, maxsplit=1)[0]
+        lo = hi = bisect_left(records, (prefix,))
+        while hi < len(records) and records[hi][0].startswith(prefix):
+            hi += 1
+        ranges.append((lo, hi))
+
+    # Walk overlapping ranges once so no record is selected twice
+    selected = []
+    pos = 0
+    for lo, hi in sorted(ranges):
+        for record in records[max(lo, pos):hi]:
+            if any(fnmatchcase(record[0], pattern) for pattern in patterns):
+                selected.append(record)
+        pos = max(pos, hi)
+    return selected
+
+def check_and_fix(dbt_root, fix_mode=False, only_cols=None, use_cache=True):
+    models_dir = Path(dbt_root) / 'models'
+    if not models_dir.is_dir():
         print(f"Error: Directory not found: {models_dir}")
         return
 
-    files = find_yaml_files(models_dir)
-    print(f"Scanning {len(files)} files in {models_dir}...")
+    print(f"Scanning files in {models_dir}...")
 
-    # Data structure:
-    # col_name -> { description -> [ {file, type, parent, table} ] }
-    col_map = defaultdict(lambda: defaultdict(list))
+    # col_name -> up to two of its distinct descriptions
+    col_descs = {}
 
-    for file_path in files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-            if not data: continue
-
-            if 'models' in data:
-                for model in data['models']:
-                    m_name = model.get('name')
-                    for col in model.get('columns', []):
-                        c_name = col.get('name')
-                        # Treat None as empty string
-                        desc = col.get('description') or ''
-                        if c_name:
-                            col_map[c_name][desc].append({
-                                'file': file_path,
-                                'type': 'model',
-                                'parent': m_name,
-                                'table': None
-                            })
-
-            if 'sources' in data:
-                for source in data['sources']:
-                    s_name = source.get('name')
-                    for table in source.get('tables', []):
-                        t_name = table.get('name')
-                        for col in table.get('columns', []):
-                            c_name = col.get('name')
-                            desc = col.get('description') or ''
-                            if c_name:
-                                col_map[c_name][desc].append({
-                                    'file': file_path,
-                                    'type': 'source',
-                                    'parent': s_name,
-                                    'table': t_name
-                                })
-
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
+    # Files whose (mtime, size) match the previous run reuse its extraction
+    cache_path = Path(dbt_root) / CACHE_FILE
+    cache_index = _load_cache_index(cache_path) if use_cache else {}
+    stale = []
+    file_count = 0
+    unreadable = 0
+
+    # Each file's records go straight to a spool file instead of staying in
+    # memory. The spool becomes the new cache, and it is read back once the
+    # conflicting columns are known. Peak memory is the per-column description
+    # sets plus the records of conflicting columns.
+    with tempfile.TemporaryFile() as spool:
+        with open(cache_path, 'rb') if cache_index else nullcontext() as old_cache:
+            for entry in find_yaml_files(models_dir):
+                file_count += 1
+                file_path = entry.path
+                try:
+                    st = entry.stat()
+                except OSError as e:
+                    print(f"Error reading {file_path}: {e}")
+                    unreadable += 1
+                    continue
+                stamp = (st.st_mtime_ns, st.st_size)
+                cached = cache_index.get(file_path)
+                if cached and cached[0] == stamp:
+                    try:
+                        line = _read_cache_line(old_cache, cached[1])
+                        extracted = _records_from_json(file_path, _split_cache_line(line)[2])
+                    except Exception:
+                        stale.append((file_path, stamp))
+                        continue
+                    _merge_results(col_descs, extracted)
+                    # The entry is unchanged, so its line is copied as is
+                    spool.write(line)
+                else:
+                    stale.append((file_path, stamp))
+
+        stale_paths = [file_path for file_path, _ in stale]
+        stale_sizes = [stamp[1] for _, stamp in stale]
+        use_pool = len(stale) >= MIN_FILES_FOR_POOL
+
+        # Results are merged as the workers deliver them, not after all files are parsed
+        with ProcessPoolExecutor() if use_pool else nullcontext() as ex:
+            if use_pool:
+                results = ex.map(_extract_from_file, stale_paths, stale_sizes, chunksize=16)
+            else:
+                results = map(_extract_from_file, stale_paths, stale_sizes)
+
+            for (file_path, stamp), extracted in zip(stale, results):
+                if extracted is None:
+                    continue
+                _write_cache_entry(spool, file_path, stamp, _merge_results(col_descs, extracted))
+
+        if use_cache:
+            _save_cache(cache_path, spool)
+        counts = f"{len(stale)} parsed, {file_count - len(stale) - unreadable} cached"
+        if unreadable:
+            counts += f", {unreadable} unreadable"
+        print(f"Scanned {file_count} files ({counts}).")
+
+        # Only columns with more than one distinct description are reported, so only
+        # their (col_name, description, file, type, parent, table, edit) records are
+        # read back; records of consistent columns are never held at once.
+        conflicting = {c_name for c_name, descs in col_descs.items() if len(descs) > 1}
+        # Equal descriptions read back share one string object
+        desc_text = {}
+        records = []
+        spool.seek(0)
+        for line in spool:
+            file_path, _, extracted = _split_cache_line(line)
+            for c_name, desc, *location in _records_from_json(file_path, extracted):
+                if c_name in conflicting:
+                    records.append((c_name, desc_text.setdefault(desc, desc), *location))
 
     # Analyze inconsistencies
     fixes_by_file = defaultdict(list)
     inconsistent_count = 0
-    
-    for col, desc_dict in col_map.items():
+
+    # Occurrences of each description are listed by file; sort is stable within a file
+    records.sort(key=itemgetter(0, 1, 2))
+    if only_cols:
+        records = select_columns(records, only_cols)
+
+    for col, col_records in groupby(records, key=itemgetter(0)):
+        desc_dict = {desc: list(occurrences) for desc, occurrences in groupby(col_records, key=itemgetter(1))}
+
         # Filter out empty descriptions from being the "winner"
         non_empty_descs = {d: locs for d, locs in desc_dict.items() if d}
         
@@ -231,11 +502,10 @@ def check_and_fix(dbt_root, fix_mode=False):
             inconsistent_count += 1
             
             # Pick best from NON-EMPTY candidates
-            sorted_descs = sorted(non_empty_descs.items(), key=lambda x: len(x[1]), reverse=True)
-            best_desc = sorted_descs[0][0]
+            best_desc, best_locs = max(non_empty_descs.items(), key=lambda kv: len(kv[1]))
             
             print(f"\nInconsistency for '{col}':")
-            print(f"  Best description ({len(sorted_descs[0][1])} uses): {repr(best_desc)}")
+            print(f"  Best description ({len(best_locs)} uses): {repr(best_desc)}")
             
             # Iterate over ALL descriptions (including empty) to find victims
             for desc, occurrences in desc_dict.items():
@@ -243,16 +513,17 @@ def check_and_fix(dbt_root, fix_mode=False):
                     continue
                     
                 print(f"  Other description ({len(occurrences)} uses): {repr(desc)}")
-                for occ in occurrences:
-                    print(f"    - {occ['file']} ({occ['type']}: {occ['parent']}{'.' + occ['table'] if occ['table'] else ''})")
+                for _, _, file_path, kind, parent, table, edit in occurrences:
+                    print(f"    - {file_path} ({kind}: {parent}{'.' + table if table else ''})")
                     
                     if fix_mode:
-                        fixes_by_file[occ['file']].append({
-                            'type': occ['type'],
-                            'parent': occ['parent'],
-                            'table': occ['table'],
+                        fixes_by_file[file_path].append({
+                            'type': kind,
+                            'parent': parent,
+                            'table': table,
                             'col': col,
-                            'new_desc': best_desc
+                            'new_desc': best_desc,
+                            'edit': edit
                         })
 
     if inconsistent_count == 0:
@@ -273,12 +544,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Check and fix dbt column description inconsistencies.')
     parser.add_argument('dir', nargs='?', default='dbt', help='Directory to scan (default: dbt)')
     parser.add_argument('--fix', action='store_true', help='Auto-fix inconsistencies by using the most frequent description')
+    parser.add_argument('--only-cols', action='append', metavar='PATTERN', help='Only check columns matching this glob, e.g. "customer_*" (repeatable)')
+    parser.add_argument('--no-cache', action='store_true', help=f'Neither read nor write the scan cache ({CACHE_FILE} in the scanned directory)')
     
     args = parser.parse_args()
     
     target_dir = args.dir
-    if not os.path.exists(target_dir):
-         if os.path.exists(os.path.join(os.getcwd(), 'models')):
+    if not Path(target_dir).exists():
+         if (Path.cwd() / 'models').is_dir():
              target_dir = os.getcwd()
              
-    check_and_fix(target_dir, args.fix)
+    check_and_fix(target_dir, args.fix, args.only_cols, not args.no_cache)
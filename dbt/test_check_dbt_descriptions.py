@@ -0,0 +1,491 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import yaml
+
+import check_dbt_descriptions as cdd
+
+# Two models that agree on every column, so their description always wins
+GOOD_MODELS = """models:
+  - name: good1
+    columns:
+      - name: c1
+        description: Good one
+      - name: c2
+        description: Good two
+      - name: c3
+        description: Good three
+  - name: good2
+    columns:
+      - name: c1
+        description: Good one
+      - name: c2
+        description: Good two
+      - name: c3
+        description: Good three
+"""
+
+LOADERS = [('SafeLoader', yaml.SafeLoader, yaml.SafeDumper)]
+if hasattr(yaml, 'CSafeLoader'):
+    LOADERS.append(('CSafeLoader', yaml.CSafeLoader, yaml.CSafeDumper))
+
+
+def write_project(root, files):
+    """
+    Writes {relative path: str or bytes} under models/ of the project at root.
+    """
+    for name, raw in files.items():
+        path = os.path.join(root, 'models', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(raw.encode('utf-8') if isinstance(raw, str) else raw)
+
+
+def run(root, *args):
+    """
+    Runs check_and_fix on the project at root and returns what it printed.
+    """
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        cdd.check_and_fix(root, *args)
+    return out.getvalue()
+
+
+def model_yaml(model, columns):
+    """
+    Returns a schema file with one model whose columns are {name: description}.
+    """
+    lines = ['models:', f'  - name: {model}', '    columns:']
+    for c_name, desc in columns.items():
+        lines.append(f'      - name: {c_name}')
+        lines.append(f'        description: {desc}')
+    return '\n'.join(lines) + '\n'
+
+
+class ProjectTestCase(unittest.TestCase):
+    """
+    Gives each test an empty dbt project in a temp directory.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+
+
+class PoolTest(ProjectTestCase):
+
+    def test_pool_matches_in_process_scan(self):
+        files = {f'm{i}.yml': model_yaml(f'm{i}', {'shared': 'Odd one' if i == 0 else 'Shared', f'own{i}': 'Own'})
+                 for i in range(cdd.MIN_FILES_FOR_POOL + 2)}
+        write_project(self.root, files)
+
+        with mock.patch.object(cdd, 'ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            pooled = run(self.root)
+        pool.assert_called_once()
+        self.assertIn("Inconsistency for 'shared'", pooled)
+
+        os.remove(os.path.join(self.root, cdd.CACHE_FILE))
+        with mock.patch.object(cdd, 'MIN_FILES_FOR_POOL', len(files) + 1):
+            in_process = run(self.root)
+        self.assertEqual(pooled, in_process)
+
+
+class FixTest(unittest.TestCase):
+    """
+    Runs check_and_fix in fix mode on small temp projects and re-parses the
+    rewritten files, once with each available loader.
+    """
+
+    def fix(self, files):
+        """
+        Writes {relative path: str or bytes} to a temp project next to the
+        good models, runs the fixer and returns {relative path: bytes}.
+        The fixer's output is kept in self.output.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            files = dict(files, **{'good.yml': GOOD_MODELS})
+            write_project(root, files)
+            self.output = run(root, True)
+            result = {}
+            for name in files:
+                with open(os.path.join(root, 'models', name), 'rb') as f:
+                    result[name] = f.read()
+            return result
+
+    def columns(self, raw, model=0):
+        data = yaml.safe_load(raw.decode('utf-8-sig'))
+        return {col['name']: col.get('description') for col in data['models'][model]['columns']}
+
+    def for_each_loader(self, check):
+        for name, loader, dumper in LOADERS:
+            with self.subTest(loader=name):
+                with mock.patch.object(cdd, '_Loader', loader), mock.patch.object(cdd, '_Dumper', dumper):
+                    # Descriptions quoted by the other dumper must not be reused
+                    cdd.quote_scalar.cache_clear()
+                    check()
+
+    def test_bom_and_crlf(self):
+        def check():
+            src = ('models:\r\n'
+                   '  - name: m\r\n'
+                   '    columns:\r\n'
+                   '      - name: c1\r\n'
+                   '        description: Wrong\r\n'
+                   '      - name: c2')
+            raw = self.fix({'a.yml': b'\xef\xbb\xbf' + src.encode('utf-8')})['a.yml']
+            self.assertTrue(raw.startswith(b'\xef\xbb\xbf'))
+            self.assertNotIn(b'\n', raw.replace(b'\r\n', b''))
+            self.assertEqual(self.columns(raw), {'c1': 'Good one', 'c2': 'Good two'})
+        self.for_each_loader(check)
+
+    def test_replace_and_insert(self):
+        def check():
+            src = ('models:\n'
+                   '  - name: m\n'
+                   '    columns:\n'
+                   '      - name: c1\n'
+                   '        description: Wrong  # keep me\n'
+                   '      - name: c2  # no description yet\n'
+                   '        tests: [unique]\n'
+                   '      - description:\n'
+                   '        name: "c3"')
+            raw = self.fix({'a.yml': src})['a.yml']
+            text = raw.decode('utf-8')
+            self.assertEqual(self.columns(raw), {'c1': 'Good one', 'c2': 'Good two', 'c3': 'Good three'})
+            self.assertIn('"Good one"  # keep me', text)
+            self.assertIn('# no description yet', text)
+            self.assertEqual(yaml.safe_load(text)['models'][0]['columns'][1]['tests'], ['unique'])
+        self.for_each_loader(check)
+
+    def test_flow_mapping_columns(self):
+        def check():
+            src = ('models:\n'
+                   '  - name: m\n'
+                   '    columns:\n'
+                   '      - {name: c1, description: "Wrong"}\n'
+                   '      - {name: c2}\n'
+                   '      - {name: c3, tests: [unique]}\n')
+            raw = self.fix({'a.yml': src})['a.yml']
+            self.assertEqual(self.columns(raw), {'c1': 'Good one', 'c2': 'Good two', 'c3': 'Good three'})
+        self.for_each_loader(check)
+
+    def test_multi_line_values(self):
+        def check():
+            src = ('models:\n'
+                   '  - name: m\n'
+                   '    columns:\n'
+                   '      - name: c1\n'
+                   '        description: |\n'
+                   '          Wrong, on\n'
+                   '          two lines\n'
+                   '\n'
+                   '      - name: c2\n'
+                   '        description: >-\n'
+                   '          folded\n'
+                   '      - name: c3\n'
+                   '        description: wrong and\n'
+                   '          continued  # keep me\n'
+                   '        tests: [not_null]\n')
+            raw = self.fix({'a.yml': src})['a.yml']
+            text = raw.decode('utf-8')
+            self.assertEqual(self.columns(raw), {'c1': 'Good one', 'c2': 'Good two', 'c3': 'Good three'})
+            self.assertIn('"Good three"  # keep me', text)
+            # The blank line after the block scalar is kept
+            self.assertIn('"Good one"\n\n', text)
+            data = yaml.safe_load(text)
+            self.assertEqual([col.get('tests') for col in data['models'][0]['columns']],
+                             [None, None, ['not_null']])
+        self.for_each_loader(check)
+
+    def test_merge_key_description_is_overridden_in_place(self):
+        def check():
+            src = ('x-defaults: &coldefaults\n'
+                   '  description: Shared\n'
+                   'models:\n'
+                   '  - name: m\n'
+                   '    columns:\n'
+                   '      - name: c1\n'
+                   '        <<: *coldefaults\n'
+                   '      - name: other\n'
+                   '        <<: *coldefaults\n')
+            raw = self.fix({'a.yml': src})['a.yml']
+            data = yaml.safe_load(raw.decode('utf-8'))
+            self.assertEqual(data['x-defaults'], {'description': 'Shared'})
+            self.assertEqual(self.columns(raw), {'c1': 'Good one', 'other': 'Shared'})
+        self.for_each_loader(check)
+
+    def test_alias_description_is_replaced_not_its_anchor(self):
+        def check():
+            src = ('x-docs:\n'
+                   '  shared: &shared_desc Shared text\n'
+                   'models:\n'
+                   '  - name: m\n'
+                   '    columns:\n'
+                   '      - name: c1\n'
+                   '        description: *shared_desc\n'
+                   '      - {name: other, description: *shared_desc}\n')
+            raw = self.fix({'a.yml': src})['a.yml']
+            data = yaml.safe_load(raw.decode('utf-8'))
+            self.assertEqual(data['x-docs'], {'shared': 'Shared text'})
+            self.assertEqual(self.columns(raw), {'c1': 'Good one', 'other': 'Shared text'})
+        self.for_each_loader(check)
+
+    def test_anchored_description_keeps_its_anchor(self):
+        def check():
+            src = ('models:\n'
+                   '  - name: m\n'
+                   '    columns:\n'
+                   '      - name: c1\n'
+                   '        description: &d Wrong\n'
+                   '      - name: other\n'
+                   '        description: *d\n')
+            raw = self.fix({'a.yml': src})['a.yml']
+            self.assertEqual(self.columns(raw), {'c1': 'Good one', 'other': 'Good one'})
+        self.for_each_loader(check)
+
+    def test_aliased_column_is_left_alone(self):
+        def check():
+            src = ('x-cols:\n'
+                   '  - &c1col {name: c1, description: Wrong}\n'
+                   'models:\n'
+                   '  - name: m\n'
+                   '    columns:\n'
+                   '      - *c1col\n')
+            raw = self.fix({'a.yml': src})['a.yml']
+            self.assertEqual(raw.decode('utf-8'), src)
+            self.assertIn("Could not locate column 'c1'", self.output)
+        self.for_each_loader(check)
+
+    def test_escaping(self):
+        def check():
+            good = model_yaml('g', {'c1': '"Say \\"hi\\" \\\\ bye\\nnext line"'})
+            raw = self.fix({'a.yml': model_yaml('a', {'c1': 'Wrong'}),
+                            'g1.yml': good, 'g2.yml': good, 'g3.yml': good})['a.yml']
+            self.assertEqual(self.columns(raw)['c1'], 'Say "hi" \\ bye\nnext line')
+        self.for_each_loader(check)
+
+
+class WriteTest(ProjectTestCase):
+
+    def test_failed_write_leaves_no_temp_file(self):
+        src = model_yaml('a', {'c1': 'Wrong'})
+        write_project(self.root, {'good.yml': GOOD_MODELS, 'a.yml': src})
+        with mock.patch.object(cdd.os, 'chmod', side_effect=PermissionError(1, 'Operation not permitted')):
+            out = run(self.root, True)
+        self.assertIn('Failed to update', out)
+        models_dir = os.path.join(self.root, 'models')
+        self.assertEqual(sorted(os.listdir(models_dir)), ['a.yml', 'good.yml'])
+        with open(os.path.join(models_dir, 'a.yml')) as f:
+            self.assertEqual(f.read(), src)
+
+
+class ScanTest(ProjectTestCase):
+
+    def test_unreadable_directory_is_skipped(self):
+        write_project(self.root, {
+            'a.yml': model_yaml('a', {'c1': 'One'}),
+            'locked/b.yml': model_yaml('b', {'c1': 'Two'}),
+        })
+        locked = os.path.join(self.root, 'models', 'locked')
+        scandir = os.scandir
+
+        def deny_locked(path):
+            if os.fspath(path) == locked:
+                raise PermissionError(13, 'Permission denied', locked)
+            return scandir(path)
+
+        with mock.patch.object(cdd.os, 'scandir', deny_locked):
+            out = run(self.root)
+        self.assertIn(f'Warning: Skipping {locked}', out)
+        self.assertIn('Scanned 1 files', out)
+
+    def test_file_that_cannot_be_stat_ed_is_not_counted_as_cached(self):
+        write_project(self.root, {'a.yml': model_yaml('a', {'c1': 'One'})})
+        gone = mock.Mock(path=os.path.join(self.root, 'models', 'gone.yml'))
+        gone.stat.side_effect = FileNotFoundError(2, 'No such file or directory')
+        find_yaml_files = cdd.find_yaml_files
+
+        def with_gone(root_dir):
+            yield from find_yaml_files(root_dir)
+            yield gone
+
+        with mock.patch.object(cdd, 'find_yaml_files', with_gone):
+            out = run(self.root)
+        self.assertIn(f'Error reading {gone.path}', out)
+        self.assertIn('Scanned 2 files (1 parsed, 0 cached, 1 unreadable).', out)
+
+    def test_symlinked_file_is_scanned_and_fixed_through_the_link(self):
+        outside = tempfile.TemporaryDirectory()
+        self.addCleanup(outside.cleanup)
+        target = os.path.join(outside.name, 'shared.yml')
+        with open(target, 'w') as f:
+            f.write(model_yaml('shared', {'c1': 'Wrong'}))
+        write_project(self.root, {'good.yml': GOOD_MODELS})
+        link = os.path.join(self.root, 'models', 'shared.yml')
+        os.symlink(target, link)
+
+        out = run(self.root, True)
+        self.assertIn(f'Updated {link}', out)
+        self.assertTrue(os.path.islink(link))
+        with open(target) as f:
+            self.assertEqual(yaml.safe_load(f)['models'][0]['columns'], [{'name': 'c1', 'description': 'Good one'}])
+
+
+class PreFilterTest(ProjectTestCase):
+
+    def test_schema_files_are_parsed(self):
+        write_project(self.root, {
+            'bom.yml': b'\xef\xbb\xbf' + model_yaml('bom', {'c1': 'Same'}).encode('utf-8'),
+            'double.yml': model_yaml('double', {'c1': 'Same'}).replace('models:', '"models":'),
+            'single.yml': ("'sources':\n  - name: s\n    tables:\n      - name: t\n"
+                           "        columns:\n          - name: c1\n            description: Same\n"),
+            'other.yml': model_yaml('other', {'c1': 'Other'}),
+        })
+        self.assertIn("Best description (3 uses): 'Same'", run(self.root))
+
+    def test_other_files_are_not_parsed(self):
+        write_project(self.root, {
+            'dbt_project.yml': 'name: proj\nvars: [not, valid\n',
+            'packages.yml': 'packages: [not, valid\n',
+            'no_columns.yml': 'models:\n  - name: m\n    description: [not, valid\n',
+            'empty.yml': '',
+        })
+        out = run(self.root)
+        self.assertNotIn('Error reading', out)
+        self.assertIn('No inconsistencies found!', out)
+
+
+class SelectColumnsTest(unittest.TestCase):
+
+    # Sorted, as select_columns expects; a column has one record per occurrence
+    NAMES = ['customer', 'customer_id', 'customer_id', 'customer_name', 'id', 'order_id', 'orders']
+
+    def select(self, *patterns):
+        records = [(name, 'description') for name in self.NAMES]
+        return [record[0] for record in cdd.select_columns(records, patterns)]
+
+    def test_overlapping_patterns_select_each_record_once(self):
+        self.assertEqual(self.select('customer*', 'customer_*', 'customer_id'),
+                         ['customer', 'customer_id', 'customer_id', 'customer_name'])
+
+    def test_patterns_without_literal_prefix(self):
+        self.assertEqual(self.select('*_id'), ['customer_id', 'customer_id', 'order_id'])
+        self.assertEqual(self.select('?d', 'order*'), ['id', 'order_id', 'orders'])
+
+    def test_no_match(self):
+        self.assertEqual(self.select('cust', 'zzz*'), [])
+
+
+class CacheTest(ProjectTestCase):
+
+    def setUp(self):
+        super().setUp()
+        write_project(self.root, {
+            'good.yml': model_yaml('good', {'c1': 'Good one'}),
+            'other.yml': model_yaml('other', {'c1': 'Good one'}),
+            'a.yml': model_yaml('a', {'c1': 'Wrong'}),
+        })
+
+    def report(self):
+        # The inconsistency report starts after the scan summary
+        return run(self.root).partition('\n\n')[2]
+
+    def test_unchanged_files_are_not_parsed_again(self):
+        first = self.report()
+        self.assertIn("Other description (1 uses): 'Wrong'", first)
+        with mock.patch.object(cdd, '_extract_from_file', side_effect=AssertionError('parsed again')):
+            self.assertEqual(self.report(), first)
+
+    def test_changed_file_is_parsed_again(self):
+        self.report()
+        path = os.path.join(self.root, 'models', 'a.yml')
+        st = os.stat(path)
+        # Same size, so only the mtime tells the cache that the file changed
+        write_project(self.root, {'a.yml': model_yaml('a', {'c1': 'Other'})})
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertIn("Other description (1 uses): 'Other'", self.report())
+
+        write_project(self.root, {'a.yml': model_yaml('a', {'c1': 'Good one'})})
+        self.assertIn('No inconsistencies found!', self.report())
+
+    def test_fix_uses_locations_recorded_during_the_scan(self):
+        self.report()
+        # Neither the cached scan nor update_file parses the YAML again
+        with mock.patch.object(cdd, 'load_schema', side_effect=AssertionError('parsed again')):
+            out = run(self.root, True)
+        self.assertIn('Updated', out)
+        with open(os.path.join(self.root, 'models', 'a.yml'), 'rb') as f:
+            self.assertEqual(yaml.safe_load(f)['models'][0]['columns'], [{'name': 'c1', 'description': 'Good one'}])
+
+    def test_cache_never_runs_code(self):
+        expected = self.report()
+        # A pickle that prints when it is unpickled
+        with open(os.path.join(self.root, cdd.CACHE_FILE), 'wb') as f:
+            f.write(b"cbuiltins\nprint\n(S'unpickled'\ntR.")
+        out = run(self.root)
+        self.assertNotIn('unpickled\n', out)
+        self.assertIn('Warning: Ignoring unreadable cache', out)
+        self.assertEqual(out.partition('\n\n')[2], expected)
+
+    def test_malformed_cache_is_ignored(self):
+        expected = self.report()
+        with open(os.path.join(self.root, cdd.CACHE_FILE), 'wb') as f:
+            f.write(b'\x80 not a cache {')
+        out = run(self.root)
+        self.assertIn('Warning: Ignoring unreadable cache', out)
+        self.assertEqual(out.partition('\n\n')[2], expected)
+        # The next run rewrites a usable cache
+        self.assertNotIn('Warning', run(self.root))
+
+    def test_entries_store_the_path_once(self):
+        self.report()
+        with open(os.path.join(self.root, cdd.CACHE_FILE), 'rb') as f:
+            lines = f.read().splitlines()[1:]
+        self.assertEqual(len(lines), 3)
+        for line in lines:
+            self.assertEqual(line.count(b'.yml'), 1)
+        # Reused records get their path back
+        with mock.patch.object(cdd, '_extract_from_file', side_effect=AssertionError('parsed again')):
+            self.assertIn(os.path.join(self.root, 'models', 'a.yml'), self.report())
+
+    def test_no_cache(self):
+        cache_path = os.path.join(self.root, cdd.CACHE_FILE)
+        out = run(self.root, False, None, False)
+        self.assertIn('(3 parsed, 0 cached)', out)
+        self.assertFalse(os.path.exists(cache_path))
+
+        self.report()
+        with open(cache_path, 'rb') as f:
+            cache = f.read()
+        self.assertIn('(3 parsed, 0 cached)', run(self.root, False, None, False))
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(f.read(), cache)
+
+    def test_failed_cache_write_leaves_no_temp_file(self):
+        with mock.patch.object(cdd.shutil, 'copyfileobj', side_effect=OSError(28, 'No space left on device')):
+            self.assertIn('Warning: Could not write cache', run(self.root))
+        self.assertFalse(os.path.exists(os.path.join(self.root, cdd.CACHE_FILE)))
+        self.assertFalse(os.path.exists(os.path.join(self.root, cdd.CACHE_FILE + '.tmp')))
+
+    def test_corrupt_entry_is_parsed_again(self):
+        expected = self.report()
+        cache_path = os.path.join(self.root, cdd.CACHE_FILE)
+        with open(cache_path, 'rb') as f:
+            lines = f.readlines()
+        # Keep the head of a.yml's entry, so only its records fail to load
+        lines = [line.partition(b'\t')[0] + b'\t[oops\n' if b'a.yml' in line else line for line in lines]
+        with open(cache_path, 'wb') as f:
+            f.writelines(lines)
+        out = run(self.root)
+        self.assertIn('(1 parsed, 2 cached)', out)
+        self.assertEqual(out.partition('\n\n')[2], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()